@@ -0,0 +1,28 @@
+"""
+Gunicorn configuration for Cogitara IA
+
+Launch with: gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import os
+import multiprocessing
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+# Threaded workers: requests are dominated by blocking DB/file I/O
+worker_class = "gthread"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+
+# Reuse client connections instead of reconnecting per request
+keepalive = 5
+
+# Load the app once in the master so workers share it copy-on-write
+preload_app = True
+
+# Heartbeat files on tmpfs avoid blocking on a slow disk
+worker_tmp_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+
+timeout = 30
+accesslog = "-"
+errorlog = "-"
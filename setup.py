@@ -7,13 +7,14 @@ setup(
     include_package_data=True,
     install_requires=[
         "Flask==3.0.0",
-        "Flask-Session==0.5.0", 
         "Werkzeug==3.0.1",
         "psutil==5.9.6",
         "python-dotenv==1.0.0",
         "gunicorn==21.2.0",
         "blinker==1.7.0",
         "Jinja2==3.1.2",
+        "argon2-cffi==23.1.0",
+        "orjson==3.9.10",
     ],
     author="Cogitara IA Team",
     author_email="dev@cogitara.com",
@@ -5,9 +5,24 @@ Cogitara IA - Advanced AI Application
 __version__ = "2.0.0"
 __author__ = "Cogitara Development Team"
 
-# Importações principais para facilitar o acesso
-from .app import create_app
-from .database import DatabaseManager
-from .utils import AdvancedUtils, SecurityManager, CacheManager, DataProcessor
+# Importações principais para facilitar o acesso, carregadas sob demanda
+# para que importar o pacote não carregue Flask, sqlite3 e psutil
+_LAZY_IMPORTS = {
+    'create_app': '.app',
+    'DatabaseManager': '.database',
+    'AdvancedUtils': '.utils',
+    'SecurityManager': '.utils',
+    'CacheManager': '.utils',
+    'DataProcessor': '.utils',
+}
 
 __all__ = ['create_app', 'DatabaseManager', 'AdvancedUtils', 'SecurityManager', 'CacheManager', 'DataProcessor']
+
+
+def __getattr__(name):
+    if name in _LAZY_IMPORTS:
+        import importlib
+        value = getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
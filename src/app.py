@@ -1,46 +1,221 @@
 import os
+import secrets
 import logging
+import logging.handlers
+import queue
+import atexit
+import tempfile
+import time
 from datetime import datetime, timedelta
-from functools import wraps
+from functools import wraps, lru_cache
 from typing import Dict, Any, List, Optional
 import json
 
-from flask import Flask, request, jsonify, render_template, session, redirect, url_for, flash
-from flask_session import Session
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Flask, request, jsonify, render_template, session, redirect, url_for, flash, g, make_response
+from flask.json.provider import DefaultJSONProvider
 from werkzeug.middleware.proxy_fix import ProxyFix
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('app.log'),
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def configure_logging() -> Optional[logging.handlers.QueueListener]:
+    """Configure root logging so request threads only enqueue records
+    
+    File and console output happen on a background QueueListener thread.
+    Like basicConfig, this does nothing if the root logger already has handlers.
+    """
+    root = logging.getLogger()
+    if root.handlers:
+        return None
+    
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handlers = [
+        # Several gunicorn workers append to this file, so rotation is left to an
+        # external tool (logrotate); WatchedFileHandler reopens it when it moves
+        logging.handlers.WatchedFileHandler('app.log'),
         logging.StreamHandler()
     ]
-)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    queue_handler = logging.handlers.QueueHandler(queue.SimpleQueue())
+    root.setLevel(logging.INFO)
+    root.addHandler(queue_handler)
+    
+    # Holds the listener running in this process; replaced in forked children
+    current = {}
+    
+    def start_listener():
+        listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+        listener.start()
+        current['listener'] = listener
+        return listener
+    
+    def restart_listener():
+        # The listener thread does not survive fork (gunicorn preload_app), and
+        # the inherited QueueListener still points at it, so build a fresh one
+        queue_handler.queue = queue.SimpleQueue()
+        start_listener()
+    
+    listener = start_listener()
+    atexit.register(lambda: current['listener'].stop())
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=restart_listener)
+    
+    return listener
+
+configure_logging()
 
 logger = logging.getLogger(__name__)
 
+_DATETIME_FORMATS = {
+    'full': "%Y-%m-%d %H:%M:%S",
+    'medium': "%Y-%m-%d %H:%M",
+    'short': "%Y-%m-%d",
+}
+
+@lru_cache(maxsize=4096)
+def _parse_iso(value: str) -> Optional[datetime]:
+    """Parse an ISO timestamp, memoized for repeated values in tables"""
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+
+def format_datetime(value, format='medium'):
+    """Template helper to format datetimes and ISO strings"""
+    if isinstance(value, str):
+        parsed = _parse_iso(value)
+        if parsed is None:
+            return value
+        value = parsed
+    return value.strftime(_DATETIME_FORMATS.get(format, _DATETIME_FORMATS['short']))
+
+_now_iso_cache = (0, '')
+
+def now_iso() -> str:
+    """Current local time as an ISO string, formatted at most once per second"""
+    global _now_iso_cache
+    second = int(time.time())
+    cached_second, value = _now_iso_cache
+    if second != cached_second:
+        value = datetime.fromtimestamp(second).isoformat()
+        _now_iso_cache = (second, value)
+    return value
+
+def get_current_year():
+    """Template helper returning the current year"""
+    return datetime.now().year
+
+class HealthCheckMiddleware:
+    """Answer health checks before Flask dispatch, sessions and routing"""
+    
+    def __init__(self, wsgi_app, path: str = '/health'):
+        self.wsgi_app = wsgi_app
+        self.path = path
+        self._body = ('', b'')
+    
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO') != self.path:
+            return self.wsgi_app(environ, start_response)
+        
+        # The body only changes when the second-granularity timestamp does
+        timestamp = now_iso()
+        cached_timestamp, body = self._body
+        if cached_timestamp != timestamp:
+            body = json.dumps({
+                'status': 'healthy',
+                'timestamp': timestamp,
+                'version': '2.0.0'
+            }).encode()
+            self._body = (timestamp, body)
+        start_response('200 OK', [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(body)))
+        ])
+        return [b''] if environ.get('REQUEST_METHOD') == 'HEAD' else [body]
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that serializes with orjson, using Flask's defaults for other types"""
+    
+    def _options(self) -> int:
+        options = orjson.OPT_NON_STR_KEYS
+        # Match DefaultJSONProvider, which sorts keys unless sort_keys is turned off
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if self._app.debug:
+            options |= orjson.OPT_INDENT_2
+        return options
+    
+    # Callers passing stdlib options (the session serializer's separators and
+    # object_hook) get the stdlib implementation so those options are honoured
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+    
+    def loads(self, s, **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+    
+    def response(self, *args: Any, **kwargs: Any):
+        # orjson already returns bytes, so the body skips the str -> bytes re-encode
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._options())
+        return self._app.response_class(body, mimetype=self.mimetype)
+
 def create_app():
     """Factory function to create and configure the Flask application"""
     
     app = Flask(__name__)
     app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
     
+    # Sessions are signed cookies holding user_id and user_role, so a known key
+    # would let anyone forge an admin session
+    secret_key = os.environ.get('SECRET_KEY')
+    if not secret_key:
+        if not app.debug:
+            raise RuntimeError("SECRET_KEY must be set when not running in debug mode")
+        secret_key = secrets.token_hex(32)
+    
     # Configuration
     app.config.update(
-        SECRET_KEY=os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production'),
-        SESSION_TYPE='filesystem',
-        SESSION_PERMANENT=False,
-        SESSION_USE_SIGNER=True,
-        SESSION_KEY_PREFIX='advanced_app_',
+        SECRET_KEY=secret_key,
+        SESSION_COOKIE_HTTPONLY=True,
+        SESSION_COOKIE_SAMESITE='Lax',
         PERMANENT_SESSION_LIFETIME=timedelta(hours=24),
         MAX_CONTENT_LENGTH=16 * 1024 * 1024,
     )
     
-    # Initialize extensions
-    Session(app)
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+    
+    # Persist compiled templates so every worker skips recompilation; without
+    # JINJA_CACHE_DIR, Jinja uses its own per-user 0700 directory and checks its owner
+    if not app.debug:
+        from jinja2 import FileSystemBytecodeCache
+        app.config['TEMPLATES_AUTO_RELOAD'] = False
+        jinja_cache_dir = os.environ.get('JINJA_CACHE_DIR')
+        if jinja_cache_dir:
+            os.makedirs(jinja_cache_dir, mode=0o700, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(jinja_cache_dir)
+    
+    # Optional per-request cProfile dumps (PROFILE=1)
+    profiling = bool(os.environ.get('PROFILE'))
+    if profiling:
+        from werkzeug.middleware.profiler import ProfilerMiddleware
+        profile_dir = os.environ.get(
+            'PROFILE_DIR', 
+            os.path.join(tempfile.gettempdir(), 'cogitara_profiles')
+        )
+        os.makedirs(profile_dir, exist_ok=True)
+        app.wsgi_app = ProfilerMiddleware(app.wsgi_app, restrictions=[30], profile_dir=profile_dir)
+    
+    # Health probes short-circuit the whole stack (outermost middleware)
+    app.wsgi_app = HealthCheckMiddleware(app.wsgi_app)
     
     # Import components here to avoid circular imports
     from .database import DatabaseManager
@@ -56,7 +231,7 @@ def create_app():
         """Decorator to require authentication"""
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            if 'user_id' not in session:
+            if g.user_id is None:
                 flash('Please log in to access this page.', 'warning')
                 return redirect(url_for('login'))
             return f(*args, **kwargs)
@@ -68,7 +243,7 @@ def create_app():
             @wraps(f)
             @require_auth
             def decorated_function(*args, **kwargs):
-                user_role = session.get('user_role', 'user')
+                user_role = g.user_role
                 if user_role != role and user_role != 'admin':
                     flash('Insufficient permissions.', 'danger')
                     return redirect(url_for('dashboard'))
@@ -76,31 +251,45 @@ def create_app():
             return decorated_function
         return decorator
 
-    # Template context processors
-    @app.context_processor
-    def utility_processor():
-        def format_datetime(value, format='medium'):
-            if isinstance(value, str):
-                try:
-                    value = datetime.fromisoformat(value.replace('Z', '+00:00'))
-                except:
-                    return value
-                    
-            if format == 'full':
-                format_str = "%Y-%m-%d %H:%M:%S"
-            elif format == 'medium':
-                format_str = "%Y-%m-%d %H:%M"
-            else:
-                format_str = "%Y-%m-%d"
-            return value.strftime(format_str)
-        
-        def get_current_year():
-            return datetime.now().year
-        
-        return dict(
-            format_datetime=format_datetime,
-            current_year=get_current_year
-        )
+    # Template helpers
+    app.add_template_global(format_datetime, 'format_datetime')
+    app.add_template_global(get_current_year, 'current_year')
+
+    def cacheable_response(body: str, max_age: int, private: bool = False):
+        """Build a conditional response with Cache-Control and ETag headers"""
+        response = make_response(body)
+        if private:
+            response.cache_control.private = True
+        else:
+            response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        response.add_etag()
+        return response.make_conditional(request)
+    
+    @app.before_request
+    def load_session_user():
+        """Resolve the logged-in user once per request for the auth decorators"""
+        g.user_id = session.get('user_id')
+        g.user_role = session.get('user_role', 'user')
+    
+    # Request timing, logged per endpoint (INFO when profiling, DEBUG otherwise)
+    timing_level = logging.INFO if profiling else logging.DEBUG
+    
+    @app.before_request
+    def start_request_timer():
+        g.request_start_ns = time.perf_counter_ns()
+    
+    @app.after_request
+    def log_request_timing(response):
+        start_ns = g.pop('request_start_ns', None)
+        if start_ns is not None and logger.isEnabledFor(timing_level):
+            logger.log(
+                timing_level,
+                "request endpoint=%s method=%s status=%s duration_ms=%.2f",
+                request.endpoint, request.method, response.status_code,
+                (time.perf_counter_ns() - start_ns) / 1e6
+            )
+        return response
 
     # Error handlers
     @app.errorhandler(404)
@@ -109,7 +298,7 @@ def create_app():
     
     @app.errorhandler(500)
     def internal_error(error):
-        logger.error(f"Server Error: {error}")
+        logger.error("Server Error: %s", error)
         return render_template('500.html'), 500
     
     @app.errorhandler(403)
@@ -120,29 +309,44 @@ def create_app():
     @app.route('/')
     def index():
         """Home page with system overview"""
-        system_stats = {
+        # Stats are shared by every visitor; one thread refreshes them at most every 5s
+        system_stats = cache_manager.get_or_set('index_stats', lambda: {
             'total_users': db_manager.get_user_count(),
             'active_sessions': 0,
             'system_uptime': AdvancedUtils.get_system_uptime(),
             'memory_usage': AdvancedUtils.get_memory_usage(),
             'cpu_usage': AdvancedUtils.get_cpu_usage(),
-            'timestamp': datetime.now().isoformat()
-        }
+            'timestamp': now_iso()
+        }, timeout=5)
+        
+        # Rendering pops any flashed messages, so the session is inspected afterwards
+        body = render_template('index.html', stats=system_stats)
         
-        return render_template('index.html', stats=system_stats)
+        if g.user_id is not None:
+            return cacheable_response(body, max_age=30, private=True)
+        
+        # Only an untouched, empty session means no flash text and no Set-Cookie,
+        # which is the one case a shared cache may store the page
+        if session or session.modified:
+            response = make_response(body)
+            response.cache_control.no_store = True
+            return response
+        return cacheable_response(body, max_age=60)
     
     @app.route('/dashboard')
     @require_auth
     def dashboard():
         """User dashboard with personalized data"""
-        user_id = session['user_id']
+        user_id = g.user_id
+        cache_key = f'user_{user_id}_dashboard'
         
-        user_data = {
-            'profile': db_manager.get_user_profile(user_id),
-            'recent_activity': db_manager.get_user_activity(user_id, limit=10),
-            'analytics': data_processor.analyze_user_behavior(user_id),
-            'notifications': db_manager.get_user_notifications(user_id)
-        }
+        user_data = cache_manager.get(cache_key)
+        if user_data is None:
+            user_data = db_manager.get_dashboard_bundle(user_id, activity_limit=10)
+            user_data['analytics'] = data_processor.analyze_user_behavior(
+                user_id, user_data['recent_activity']
+            )
+            cache_manager.set(cache_key, user_data, timeout=30)
         
         return render_template('dashboard.html', data=user_data)
     
@@ -168,7 +372,8 @@ def create_app():
                 session['user_id'] = user['id']
                 session['username'] = user['username']
                 session['user_role'] = user['role']
-                session['login_time'] = datetime.now().isoformat()
+                session['login_time'] = time.time()
+                cache_manager.delete(f"user_{user['id']}_dashboard")
                 
                 # Log login activity
                 db_manager.log_activity(
@@ -205,14 +410,18 @@ def create_app():
                 errors.append('Password must be at least 8 characters with uppercase, lowercase, number and special character.')
             if password != confirm_password:
                 errors.append('Passwords do not match.')
-            if db_manager.username_exists(username):
+            
+            # One query for both checks, before any password hashing happens
+            username_taken, email_taken = db_manager.signup_conflicts(username, email)
+            if username_taken:
                 errors.append('Username already exists.')
-            if db_manager.email_exists(email):
+            if email_taken:
                 errors.append('Email already registered.')
             
             if not errors:
                 user_id = db_manager.create_user(username, email, password)
                 if user_id:
+                    cache_manager.delete('index_stats')
                     flash('Registration successful! Please log in.', 'success')
                     return redirect(url_for('login'))
                 else:
@@ -259,20 +468,21 @@ def create_app():
             
             # Log analysis activity
             db_manager.log_activity(
-                session['user_id'],
+                g.user_id,
                 'data_analysis',
                 f'Analysis performed: {analysis_type}'
             )
+            cache_manager.delete(f'user_{g.user_id}_dashboard')
             
             return jsonify({
                 'success': True,
                 'analysis_type': analysis_type,
                 'result': result,
-                'timestamp': datetime.now().isoformat()
+                'timestamp': now_iso()
             })
             
         except Exception as e:
-            logger.error(f"Analysis error: {str(e)}")
+            logger.error("Analysis error: %s", e)
             return jsonify({'error': 'Analysis failed'}), 500
     
     @app.route('/api/v1/process-file', methods=['POST'])
@@ -294,7 +504,7 @@ def create_app():
             
             # Store processing result
             db_manager.save_processing_result(
-                session['user_id'],
+                g.user_id,
                 file.filename,
                 'txt',
                 result.data
@@ -308,28 +518,28 @@ def create_app():
             })
             
         except Exception as e:
-            logger.error(f"File processing error: {str(e)}")
+            logger.error("File processing error: %s", e)
             return jsonify({'error': 'File processing failed'}), 500
     
     @app.route('/profile')
     @require_auth
     def profile():
         """User profile management"""
-        user_profile = db_manager.get_user_profile(session['user_id'])
+        user_profile = db_manager.get_user_profile(g.user_id)
         return render_template('profile.html', profile=user_profile)
     
     @app.route('/analytics')
     @require_auth
     def analytics():
         """Advanced analytics dashboard"""
-        return render_template('analytics.html')
+        return cacheable_response(render_template('analytics.html'), max_age=30, private=True)
     
     @app.route('/logout')
     def logout():
         """Logout with session cleanup"""
-        if 'user_id' in session:
+        if g.user_id is not None:
             db_manager.log_activity(
-                session['user_id'],
+                g.user_id,
                 'logout',
                 'User logged out'
             )
@@ -338,20 +548,12 @@ def create_app():
         flash('You have been logged out successfully.', 'info')
         return redirect(url_for('index'))
     
-    # API Health Check
-    @app.route('/health')
-    def health_check():
-        """Health check endpoint"""
-        return jsonify({
-            'status': 'healthy',
-            'timestamp': datetime.now().isoformat(),
-            'version': '2.0.0'
-        })
-    
     logger.info("Cogitara IA Application initialized successfully")
     return app
 
-# For direct execution
+# Development server only; production runs under gunicorn (see gunicorn.conf.py)
 if __name__ == '__main__':
+    # Set before create_app so the production-only template settings are skipped
+    os.environ.setdefault('FLASK_DEBUG', '1')
     app = create_app()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -1,13 +1,131 @@
 import sqlite3
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import json
 import threading
 from contextlib import contextmanager
 
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
+from werkzeug.security import check_password_hash
+
 logger = logging.getLogger(__name__)
 
+# Applied to every new connection: WAL lets readers run alongside a writer,
+# NORMAL sync is safe under WAL, mmap serves reads from the page cache, and
+# a 20 MB page cache plus in-memory temp tables keep sorts off the disk
+_CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA temp_store=MEMORY",
+)
+
+_ACTIVITY_INSERT = """
+    INSERT INTO activity_logs 
+    (user_id, activity_type, description, ip_address, user_agent, metadata)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+_PROCESSING_RESULT_INSERT = """
+    INSERT INTO processing_results 
+    (user_id, filename, file_type, result_data, processing_time)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+_NOTIFICATION_INSERT = """
+    INSERT INTO user_notifications 
+    (user_id, title, message, notification_type, expires_at)
+    VALUES (?, ?, ?, ?, datetime('now', ?))
+"""
+
+_USER_INSERT = """
+    INSERT INTO users (username, email, password_hash, profile_data)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT DO NOTHING
+"""
+
+_ADMIN_INSERT = "INSERT OR IGNORE INTO users (username, email, password_hash, role) VALUES (?, ?, ?, ?)"
+
+_USER_AUTH_SELECT = """
+    SELECT id, username, email, password_hash, role, is_active, 
+           last_login, login_count
+    FROM users 
+    WHERE username = ? AND is_active = 1
+"""
+
+_USER_LOGIN_UPDATE = """
+    UPDATE users 
+    SET last_login = CURRENT_TIMESTAMP, login_count = login_count + 1,
+        password_hash = COALESCE(?, password_hash)
+    WHERE id = ?
+"""
+
+_USER_PROFILE_SELECT = """
+    SELECT id, username, email, role, created_at, last_login, login_count, profile_data
+    FROM users WHERE id = ?
+"""
+
+_USER_COUNT = "SELECT COUNT(*) as count FROM users"
+
+_ALL_USERS_SELECT = """
+    SELECT id, username, email, role, created_at, last_login, is_active
+    FROM users ORDER BY created_at DESC
+"""
+
+_USERNAME_EXISTS = "SELECT 1 FROM users WHERE username = ?"
+_EMAIL_EXISTS = "SELECT 1 FROM users WHERE email = ?"
+_SIGNUP_CONFLICTS = """
+    SELECT EXISTS(SELECT 1 FROM users WHERE username = ?),
+           EXISTS(SELECT 1 FROM users WHERE email = ?)
+"""
+
+_USER_ACTIVITY_SELECT = """
+    SELECT activity_type, description, created_at, metadata
+    FROM activity_logs 
+    WHERE user_id = ? 
+    ORDER BY created_at DESC 
+    LIMIT ?
+"""
+
+_SYSTEM_LOGS_SELECT = """
+    SELECT level, module, message, created_at
+    FROM system_logs 
+    ORDER BY created_at DESC 
+    LIMIT ?
+"""
+
+# Fixed texts for both notification filters so each maps to one cached statement;
+# expiry is stored and compared in SQLite's own UTC timestamp format
+_NOTIFICATIONS_SELECT = """
+    SELECT id, title, message, notification_type, created_at, is_read
+    FROM user_notifications 
+    WHERE user_id = ? AND (expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP)
+    ORDER BY created_at DESC LIMIT 20
+"""
+
+_UNREAD_NOTIFICATIONS_SELECT = """
+    SELECT id, title, message, notification_type, created_at, is_read
+    FROM user_notifications 
+    WHERE user_id = ? AND (expires_at IS NULL OR expires_at > CURRENT_TIMESTAMP) AND is_read = 0
+    ORDER BY created_at DESC LIMIT 20
+"""
+
+def _to_json(value: Any) -> str:
+    """Serialize to compact JSON for storage"""
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+# Every new account starts from the same profile, so it is serialized once
+_DEFAULT_PROFILE_DATA = _to_json({
+    'registration_ip': '127.0.0.1',
+    'preferences': {},
+    'statistics': {'files_processed': 0}
+})
+
+# Argon2id tuned to keep a login well under the cost of Werkzeug's PBKDF2 default
+_password_hasher = PasswordHasher(time_cost=2, memory_cost=64 * 1024, parallelism=1)
+
 class DatabaseManager:
     """Advanced database management with connection pooling"""
     
@@ -15,29 +133,92 @@ class DatabaseManager:
         self.db_path = db_path
         self._local = threading.local()
         self.init_database()
+        # Don't hand this connection to forked workers (gunicorn preload_app);
+        # each thread opens its own on first use
+        self.close()
     
     def get_connection(self) -> sqlite3.Connection:
         """Get thread-local database connection"""
         if not hasattr(self._local, 'connection'):
             self._local.connection = sqlite3.connect(
                 self.db_path, 
-                check_same_thread=False
+                check_same_thread=False,
+                cached_statements=256
             )
             self._local.connection.row_factory = sqlite3.Row
+            for pragma in _CONNECTION_PRAGMAS:
+                self._local.connection.execute(pragma)
         return self._local.connection
     
+    def close(self):
+        """Close this thread's database connection, if one is open"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            del self._local.connection
+    
+    @staticmethod
+    def hash_password(password: str) -> str:
+        """Hash a password with Argon2id"""
+        return _password_hasher.hash(password)
+    
+    @staticmethod
+    def verify_password(password_hash: str, password: str) -> bool:
+        """Verify a password against an Argon2 or legacy Werkzeug hash"""
+        if password_hash.startswith('$argon2'):
+            try:
+                return _password_hasher.verify(password_hash, password)
+            except (VerificationError, InvalidHashError):
+                return False
+        return check_password_hash(password_hash, password)
+    
+    @staticmethod
+    def password_needs_rehash(password_hash: str) -> bool:
+        """Check if a stored hash is legacy or uses outdated Argon2 parameters"""
+        if not password_hash.startswith('$argon2'):
+            return True
+        return _password_hasher.check_needs_rehash(password_hash)
+    
     @contextmanager
     def transaction(self):
         """Context manager for database transactions"""
         conn = self.get_connection()
+        # Take the write lock up front so concurrent writers wait on busy_timeout
+        # instead of failing when a deferred read lock cannot be upgraded
+        conn.execute("BEGIN IMMEDIATE")
         try:
             yield conn
             conn.commit()
         except Exception as e:
             conn.rollback()
-            logger.error(f"Transaction failed: {e}")
+            logger.error("Transaction failed: %s", e)
             raise
     
+    @contextmanager
+    def read(self):
+        """Context manager for read-only queries (no commit)"""
+        yield self.get_connection()
+    
+    @contextmanager
+    def snapshot(self):
+        """Context manager for several reads that must see one consistent state"""
+        conn = self.get_connection()
+        # A deferred BEGIN takes no write lock, and ending a transaction that
+        # wrote nothing does no disk I/O; it only releases the read snapshot
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        finally:
+            conn.rollback()
+    
+    @staticmethod
+    def _fetch_dicts(conn: sqlite3.Connection, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        """Run a query and return rows as dicts, resolving column names once"""
+        cursor = conn.execute(sql, params)
+        cursor.row_factory = None
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
     def init_database(self):
         """Initialize database with all required tables"""
         tables = [
@@ -52,6 +233,7 @@ class DatabaseManager:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 last_login TIMESTAMP,
+                login_count INTEGER DEFAULT 0,
                 profile_data TEXT
             )
             """,
@@ -106,207 +288,206 @@ class DatabaseManager:
         ]
         
         indexes = [
-            "CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)",
-            "CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)",
-            "CREATE INDEX IF NOT EXISTS idx_activity_user_time ON activity_logs(user_id, created_at)",
-            "CREATE INDEX IF NOT EXISTS idx_notifications_user ON user_notifications(user_id, is_read)"
+            # username and email lookups use the UNIQUE constraints' own indexes
+            "DROP INDEX IF EXISTS idx_users_username",
+            "DROP INDEX IF EXISTS idx_users_email",
+            # Covers the recent-activity query so it is answered from the index alone
+            "DROP INDEX IF EXISTS idx_activity_user_time",
+            """CREATE INDEX IF NOT EXISTS idx_activity_covering ON activity_logs(
+                user_id, created_at DESC, activity_type, description, metadata)""",
+            # Walks notifications newest-first and filters expiry without a sort
+            "DROP INDEX IF EXISTS idx_notifications_user",
+            """CREATE INDEX IF NOT EXISTS idx_notifications_user_time ON user_notifications(
+                user_id, is_read, created_at DESC, expires_at)""",
+            "CREATE INDEX IF NOT EXISTS idx_processing_user ON processing_results(user_id, created_at DESC)",
+            "CREATE INDEX IF NOT EXISTS idx_system_logs_time ON system_logs(created_at)"
         ]
         
         with self.transaction() as conn:
             for table_sql in tables:
                 conn.execute(table_sql)
+            self._migrate_users_login_count(conn)
             for index_sql in indexes:
                 conn.execute(index_sql)
             
-            # Create default admin user if not exists
-            from werkzeug.security import generate_password_hash
-            admin_hash = generate_password_hash('admin123')
-            try:
+            # Create default admin user if not exists; skip the KDF when it does
+            if conn.execute(_USERNAME_EXISTS, ('admin',)).fetchone() is None:
                 conn.execute(
-                    "INSERT OR IGNORE INTO users (username, email, password_hash, role) VALUES (?, ?, ?, ?)",
-                    ('admin', 'admin@cogitara.com', admin_hash, 'admin')
+                    _ADMIN_INSERT,
+                    ('admin', 'admin@cogitara.com', self.hash_password('admin123'), 'admin')
                 )
-            except:
-                pass
+        
+        # Refresh planner statistics for indexes whose tables have changed
+        self.get_connection().execute("PRAGMA optimize")
+    
+    def _migrate_users_login_count(self, conn: sqlite3.Connection):
+        """Move the login counter out of profile_data on databases created before the column"""
+        columns = {row['name'] for row in conn.execute("PRAGMA table_info(users)")}
+        if 'login_count' not in columns:
+            conn.execute("ALTER TABLE users ADD COLUMN login_count INTEGER DEFAULT 0")
+            conn.execute("""
+                UPDATE users 
+                SET login_count = COALESCE(CASE WHEN json_valid(profile_data)
+                    THEN json_extract(profile_data, '$.statistics.logins') END, 0)
+            """)
     
     def create_user(self, username: str, email: str, password: str) -> Optional[int]:
         """Create a new user with hashed password"""
-        from werkzeug.security import generate_password_hash
+        password_hash = self.hash_password(password)
         
-        password_hash = generate_password_hash(password)
-        profile_data = json.dumps({
-            'registration_ip': '127.0.0.1',
-            'preferences': {},
-            'statistics': {'logins': 0, 'files_processed': 0}
-        })
+        # A taken username or email inserts nothing instead of raising IntegrityError
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                _USER_INSERT, (username, email, password_hash, _DEFAULT_PROFILE_DATA)
+            )
         
-        try:
-            with self.transaction() as conn:
-                cursor = conn.execute("""
-                    INSERT INTO users (username, email, password_hash, profile_data)
-                    VALUES (?, ?, ?, ?)
-                """, (username, email, password_hash, profile_data))
-                return cursor.lastrowid
-        except sqlite3.IntegrityError:
-            logger.warning(f"User creation failed - username or email exists: {username}")
+        if cursor.rowcount == 0:
+            logger.info("User creation skipped - username or email exists: %s", username)
             return None
+        return cursor.lastrowid
     
     def authenticate_user(self, username: str, password: str) -> Optional[Dict[str, Any]]:
         """Authenticate user and return user data if successful"""
-        from werkzeug.security import check_password_hash
-        
         try:
-            with self.transaction() as conn:
-                user = conn.execute("""
-                    SELECT id, username, email, password_hash, role, is_active, 
-                           last_login, profile_data
-                    FROM users 
-                    WHERE username = ? AND is_active = 1
-                """, (username,)).fetchone()
-                
-                if user and check_password_hash(user['password_hash'], password):
-                    # Update last login
-                    conn.execute(
-                        "UPDATE users SET last_login = ? WHERE id = ?",
-                        (datetime.now(), user['id'])
-                    )
-                    
-                    # Update login count in profile
-                    profile = json.loads(user['profile_data'])
-                    profile['statistics']['logins'] = profile['statistics'].get('logins', 0) + 1
-                    
-                    conn.execute(
-                        "UPDATE users SET profile_data = ? WHERE id = ?",
-                        (json.dumps(profile), user['id'])
-                    )
-                    
-                    return dict(user)
+            with self.read() as conn:
+                user = conn.execute(_USER_AUTH_SELECT, (username,)).fetchone()
+            
+            # Hashing dominates a login, so it runs before the write transaction opens
+            if not user or not self.verify_password(user['password_hash'], password):
                 return None
+            
+            # Upgrade legacy PBKDF2 hashes to Argon2id on successful login
+            new_hash = None
+            if self.password_needs_rehash(user['password_hash']):
+                new_hash = self.hash_password(password)
+            
+            # One row write per login; a NULL new hash keeps the stored one
+            with self.transaction() as conn:
+                conn.execute(_USER_LOGIN_UPDATE, (new_hash, user['id']))
+            
+            return dict(user)
         except Exception as e:
-            logger.error(f"Authentication error: {e}")
+            logger.error("Authentication error: %s", e)
             return None
     
     def username_exists(self, username: str) -> bool:
         """Check if username already exists"""
-        with self.transaction() as conn:
-            result = conn.execute(
-                "SELECT 1 FROM users WHERE username = ?", 
-                (username,)
-            ).fetchone()
+        with self.read() as conn:
+            result = conn.execute(_USERNAME_EXISTS, (username,)).fetchone()
             return result is not None
     
     def email_exists(self, email: str) -> bool:
         """Check if email already exists"""
-        with self.transaction() as conn:
-            result = conn.execute(
-                "SELECT 1 FROM users WHERE email = ?", 
-                (email,)
-            ).fetchone()
+        with self.read() as conn:
+            result = conn.execute(_EMAIL_EXISTS, (email,)).fetchone()
             return result is not None
     
+    def signup_conflicts(self, username: str, email: str) -> Tuple[bool, bool]:
+        """Check whether username and email are taken in a single query"""
+        with self.read() as conn:
+            username_taken, email_taken = conn.execute(_SIGNUP_CONFLICTS, (username, email)).fetchone()
+            return bool(username_taken), bool(email_taken)
+    
     def get_user_profile(self, user_id: int) -> Dict[str, Any]:
         """Get comprehensive user profile"""
-        with self.transaction() as conn:
-            user = conn.execute("""
-                SELECT id, username, email, role, created_at, last_login, profile_data
-                FROM users WHERE id = ?
-            """, (user_id,)).fetchone()
-            
-            if user:
-                profile = dict(user)
-                try:
-                    profile['profile_data'] = json.loads(user['profile_data'])
-                except:
-                    profile['profile_data'] = {}
-                return profile
-            return {}
+        with self.read() as conn:
+            return self._fetch_user_profile(conn, user_id)
+    
+    def _fetch_user_profile(self, conn: sqlite3.Connection, user_id: int) -> Dict[str, Any]:
+        user = conn.execute(_USER_PROFILE_SELECT, (user_id,)).fetchone()
+        
+        if user:
+            profile = dict(user)
+            # A NULL profile (e.g. the seeded admin) is expected, so it skips the parse
+            raw_profile = user['profile_data']
+            try:
+                profile['profile_data'] = json.loads(raw_profile) if raw_profile else {}
+            except ValueError:
+                logger.warning("Invalid profile_data for user %s", user_id)
+                profile['profile_data'] = {}
+            return profile
+        return {}
+    
+    def get_dashboard_bundle(self, user_id: int, activity_limit: int = 10) -> Dict[str, Any]:
+        """Get profile, recent activity and notifications from one read transaction"""
+        with self.snapshot() as conn:
+            return {
+                'profile': self._fetch_user_profile(conn, user_id),
+                'recent_activity': self._fetch_user_activity(conn, user_id, activity_limit),
+                'notifications': self._fetch_user_notifications(conn, user_id, True)
+            }
     
     def log_activity(self, user_id: int, activity_type: str, description: str, 
                     ip_address: str = None, user_agent: str = None, metadata: Dict = None):
         """Log user activity"""
         with self.transaction() as conn:
-            conn.execute("""
-                INSERT INTO activity_logs 
-                (user_id, activity_type, description, ip_address, user_agent, metadata)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (user_id, activity_type, description, ip_address, user_agent, 
-                 json.dumps(metadata or {})))
+            conn.execute(_ACTIVITY_INSERT, (user_id, activity_type, description, ip_address, 
+                                            user_agent, _to_json(metadata or {})))
+    
+    def log_activities_bulk(self, activities: List[Dict[str, Any]]):
+        """Log several user activities in one transaction"""
+        rows = [
+            (a['user_id'], a['activity_type'], a['description'], a.get('ip_address'),
+             a.get('user_agent'), _to_json(a.get('metadata') or {}))
+            for a in activities
+        ]
+        with self.transaction() as conn:
+            conn.executemany(_ACTIVITY_INSERT, rows)
     
     def get_user_activity(self, user_id: int, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recent user activity"""
-        with self.transaction() as conn:
-            activities = conn.execute("""
-                SELECT activity_type, description, created_at, metadata
-                FROM activity_logs 
-                WHERE user_id = ? 
-                ORDER BY created_at DESC 
-                LIMIT ?
-            """, (user_id, limit)).fetchall()
-            
-            return [dict(activity) for activity in activities]
+        with self.read() as conn:
+            return self._fetch_user_activity(conn, user_id, limit)
+    
+    def _fetch_user_activity(self, conn: sqlite3.Connection, user_id: int, 
+                             limit: int) -> List[Dict[str, Any]]:
+        return self._fetch_dicts(conn, _USER_ACTIVITY_SELECT, (user_id, limit))
     
     def save_processing_result(self, user_id: int, filename: str, file_type: str, 
                              result_data: Dict[str, Any]):
         """Save file processing results"""
         with self.transaction() as conn:
-            conn.execute("""
-                INSERT INTO processing_results 
-                (user_id, filename, file_type, result_data, processing_time)
-                VALUES (?, ?, ?, ?, ?)
-            """, (user_id, filename, file_type, json.dumps(result_data), 0))
+            conn.execute(_PROCESSING_RESULT_INSERT, 
+                         (user_id, filename, file_type, _to_json(result_data), 0))
     
     def get_user_count(self) -> int:
         """Get total number of users"""
-        with self.transaction() as conn:
-            result = conn.execute("SELECT COUNT(*) as count FROM users").fetchone()
+        with self.read() as conn:
+            result = conn.execute(_USER_COUNT).fetchone()
             return result['count'] if result else 0
     
     def get_all_users(self) -> List[Dict[str, Any]]:
         """Get all users (admin function)"""
-        with self.transaction() as conn:
-            users = conn.execute("""
-                SELECT id, username, email, role, created_at, last_login, is_active
-                FROM users ORDER BY created_at DESC
-            """).fetchall()
-            return [dict(user) for user in users]
+        with self.read() as conn:
+            return self._fetch_dicts(conn, _ALL_USERS_SELECT)
     
     def get_system_logs(self, limit: int = 50) -> List[Dict[str, Any]]:
         """Get system logs"""
-        with self.transaction() as conn:
-            logs = conn.execute("""
-                SELECT level, module, message, created_at
-                FROM system_logs 
-                ORDER BY created_at DESC 
-                LIMIT ?
-            """, (limit,)).fetchall()
-            return [dict(log) for log in logs]
+        with self.read() as conn:
+            return self._fetch_dicts(conn, _SYSTEM_LOGS_SELECT, (limit,))
     
     def get_user_notifications(self, user_id: int, unread_only: bool = True) -> List[Dict[str, Any]]:
         """Get user notifications"""
-        with self.transaction() as conn:
-            query = """
-                SELECT id, title, message, notification_type, created_at, is_read
-                FROM user_notifications 
-                WHERE user_id = ? AND (expires_at IS NULL OR expires_at > ?)
-            """
-            params = [user_id, datetime.now()]
-            
-            if unread_only:
-                query += " AND is_read = 0"
-            
-            query += " ORDER BY created_at DESC LIMIT 20"
-            
-            notifications = conn.execute(query, params).fetchall()
-            return [dict(notif) for notif in notifications]
+        with self.read() as conn:
+            return self._fetch_user_notifications(conn, user_id, unread_only)
+    
+    def _fetch_user_notifications(self, conn: sqlite3.Connection, user_id: int, 
+                                  unread_only: bool) -> List[Dict[str, Any]]:
+        query = _UNREAD_NOTIFICATIONS_SELECT if unread_only else _NOTIFICATIONS_SELECT
+        return self._fetch_dicts(conn, query, (user_id,))
     
     def create_notification(self, user_id: int, title: str, message: str, 
                           notification_type: str = 'info', expires_hours: int = 24):
         """Create a new notification for user"""
-        expires_at = datetime.now() + timedelta(hours=expires_hours)
+        with self.transaction() as conn:
+            conn.execute(_NOTIFICATION_INSERT, 
+                         (user_id, title, message, notification_type, f'+{int(expires_hours)} hours'))
+    
+    def create_notifications_bulk(self, user_ids: List[int], title: str, message: str, 
+                                  notification_type: str = 'info', expires_hours: int = 24):
+        """Create the same notification for several users in one transaction"""
+        expires_in = f'+{int(expires_hours)} hours'
+        rows = [(user_id, title, message, notification_type, expires_in) for user_id in user_ids]
         
         with self.transaction() as conn:
-            conn.execute("""
-                INSERT INTO user_notifications 
-                (user_id, title, message, notification_type, expires_at)
-                VALUES (?, ?, ?, ?, ?)
-            """, (user_id, title, message, notification_type, expires_at))
+            conn.executemany(_NOTIFICATION_INSERT, rows)
@@ -5,8 +5,8 @@ import json
 import time
 import re
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional, Tuple, Union
-from collections import defaultdict, Counter
+from typing import Callable, Dict, Any, List, Optional, Tuple, Union
+from collections import defaultdict, Counter, deque
 import statistics
 import math
 from functools import wraps
@@ -16,6 +16,95 @@ import threading
 
 logger = logging.getLogger(__name__)
 
+# Patterns compiled once at import instead of being looked up on every call
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+_PHONE_RE = re.compile(r'^\+?[1-9]\d{1,14}$')
+_USERNAME_RE = re.compile(r'^[a-zA-Z0-9_.-]+$')
+_XSS_RE = re.compile(
+    '|'.join(f'(?:{pattern})' for pattern in (
+        r'<script.*?>.*?</script>',
+        r'javascript:',
+        r'on\w+\s*=',
+        r'<iframe.*?>',
+        r'<object.*?>'
+    )),
+    re.IGNORECASE
+)
+_BLOCKED_USERNAMES = frozenset(['admin', 'root', 'system', 'administrator'])
+
+# Sentiment lexicon used by DataProcessor.analyze_text
+_POSITIVE_WORDS = frozenset(['good', 'great', 'excellent', 'amazing', 'wonderful', 'fantastic', 'positive', 'happy'])
+_NEGATIVE_WORDS = frozenset(['bad', 'terrible', 'awful', 'horrible', 'disappointing', 'negative', 'sad', 'poor'])
+_SENTIMENT_LEXICON = dict(
+    [(word, 1.0) for word in _POSITIVE_WORDS] + [(word, -1.0) for word in _NEGATIVE_WORDS]
+)
+_NEGATIONS = frozenset(['not', 'no', 'never', 'nor', 'hardly', 'nothing', 'without'])
+# Clause punctuation ends a pending negation ("no problems, great service")
+_CLAUSE_BREAKS = frozenset(',.;:!?')
+# Tokens after a negation that it can still reach ("not a good movie")
+_NEGATION_WINDOW = 3
+_INTENSIFIERS = {
+    'very': 1.3, 'really': 1.3, 'extremely': 1.5, 'so': 1.2, 'quite': 1.1,
+    'somewhat': 0.7, 'slightly': 0.5, 'barely': 0.5
+}
+
+def _score_sentiment(tokens: List[str]) -> Tuple[int, int, float]:
+    """Single-pass lexicon scorer returning (positive, negative, polarity)
+    
+    Takes _SENTIMENT_TOKEN_RE tokens. A negation (or an "n't" contraction) flips
+    and halves the polarity of the next sentiment word within _NEGATION_WINDOW
+    tokens of the same clause, and an intensifier scales it. Polarity is the
+    mean over scored words.
+    """
+    positive = negative = 0
+    total = 0.0
+    negation_left = 0
+    modifier = 1.0
+    
+    for word in tokens:
+        if word in _CLAUSE_BREAKS:
+            negation_left = 0
+            modifier = 1.0
+            continue
+        if word in _NEGATIONS or word.endswith("n't"):
+            negation_left = _NEGATION_WINDOW
+            continue
+        if word in _INTENSIFIERS:
+            modifier *= _INTENSIFIERS[word]
+            continue
+        
+        polarity = _SENTIMENT_LEXICON.get(word)
+        if polarity is None:
+            # Filler words ("a", "the") keep a pending negation alive briefly
+            negation_left = max(negation_left - 1, 0)
+            modifier = 1.0
+            continue
+        
+        polarity *= modifier
+        if negation_left:
+            polarity *= -0.5
+        total += polarity
+        if polarity > 0:
+            positive += 1
+        else:
+            negative += 1
+        negation_left = 0
+        modifier = 1.0
+    
+    scored = positive + negative
+    return positive, negative, max(-1.0, min(1.0, total / scored)) if scored else 0.0
+
+_WORD_RE = re.compile(r'\b\w+\b')
+# Words with "'t" kept whole ("isn't"), plus clause punctuation, for _score_sentiment
+_SENTIMENT_TOKEN_RE = re.compile(r"\w+(?:'t)?|[,.;:!?]")
+_SENTENCE_SPLIT_RE = re.compile(r'[.!?]+')
+_TEXT_PATTERNS = {
+    'emails': re.compile(r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'),
+    'urls': re.compile(r'https?://[^\s]+'),
+    'dates': re.compile(r'\b\d{4}-\d{2}-\d{2}\b'),
+    'numbers': re.compile(r'\b\d+(?:\.\d+)?\b')
+}
+
 class SecurityLevel(Enum):
     LOW = "low"
     MEDIUM = "medium" 
@@ -44,14 +133,12 @@ class AdvancedUtils:
     @staticmethod
     def validate_email(email: str) -> bool:
         """Comprehensive email validation"""
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return bool(re.match(pattern, email))
+        return bool(_EMAIL_RE.match(email))
     
     @staticmethod
     def validate_phone(phone: str) -> bool:
         """International phone number validation"""
-        pattern = r'^\+?[1-9]\d{1,14}$'
-        return bool(re.match(pattern, phone))
+        return bool(_PHONE_RE.match(phone))
     
     @staticmethod
     def format_file_size(size_bytes: int) -> str:
@@ -73,7 +160,7 @@ class AdvancedUtils:
             with open('/proc/uptime', 'r') as f:
                 uptime_seconds = float(f.readline().split()[0])
                 return str(timedelta(seconds=uptime_seconds))
-        except:
+        except (OSError, ValueError, IndexError):
             # Fallback for other platforms
             return "Unknown"
     
@@ -98,7 +185,7 @@ class AdvancedUtils:
         try:
             import psutil
             return {
-                'percent': round(psutil.cpu_percent(interval=1), 2),
+                'percent': round(psutil.cpu_percent(interval=None), 2),
                 'cores': psutil.cpu_count(),
                 'load_average': [round(x, 2) for x in os.getloadavg()] if hasattr(os, 'getloadavg') else []
             }
@@ -117,18 +204,26 @@ class AdvancedUtils:
             'python_version': os.sys.version
         }
 
+# Upper bound on attempts remembered per IP, well above any blocking threshold
+_MAX_TRACKED_ATTEMPTS = 100
+
 class SecurityManager:
     """Advanced security management with threat detection"""
     
     def __init__(self):
-        self.failed_attempts = defaultdict(list)
+        self.failed_attempts = defaultdict(lambda: deque(maxlen=_MAX_TRACKED_ATTEMPTS))
         self.blocked_ips = set()
         self.suspicious_patterns = [
-            r".*(\bselect\b|\binsert\b|\bupdate\b|\bdelete\b|\bdrop\b).*",
-            r".*(<script>|javascript:).*",
-            r".*(\.\./|\.\.\\).*",
-            r".*(union.*select).*",
+            r"\bselect\b|\binsert\b|\bupdate\b|\bdelete\b|\bdrop\b",
+            r"<script>|javascript:",
+            r"\.\./|\.\.\\",
+            r"union.*select",
         ]
+        # A single alternation scans the input once instead of once per pattern
+        self._suspicious_re = re.compile(
+            '|'.join(f'(?:{pattern})' for pattern in self.suspicious_patterns),
+            re.IGNORECASE
+        )
     
     def is_valid_username(self, username: str) -> bool:
         """Validate username against security rules"""
@@ -136,12 +231,11 @@ class SecurityManager:
             return False
         
         # Only allow alphanumeric and some special characters
-        if not re.match(r'^[a-zA-Z0-9_.-]+$', username):
+        if not _USERNAME_RE.match(username):
             return False
         
         # Prevent common vulnerable usernames
-        blocked_usernames = ['admin', 'root', 'system', 'administrator']
-        if username.lower() in blocked_usernames:
+        if username.lower() in _BLOCKED_USERNAMES:
             return False
         
         return True
@@ -166,51 +260,35 @@ class SecurityManager:
     
     def detect_sql_injection(self, input_string: str) -> bool:
         """Detect potential SQL injection attempts"""
-        input_lower = input_string.lower()
-        for pattern in self.suspicious_patterns:
-            if re.match(pattern, input_lower, re.IGNORECASE):
-                return True
-        return False
+        return self._suspicious_re.search(input_string) is not None
     
     def detect_xss(self, input_string: str) -> bool:
         """Detect potential XSS attempts"""
-        xss_patterns = [
-            r'<script.*?>.*?</script>',
-            r'javascript:',
-            r'on\w+\s*=',
-            r'<iframe.*?>',
-            r'<object.*?>'
-        ]
-        
-        for pattern in xss_patterns:
-            if re.search(pattern, input_string, re.IGNORECASE):
-                return True
-        return False
+        return _XSS_RE.search(input_string) is not None
     
     def record_failed_attempt(self, ip_address: str, max_attempts: int = 5, 
                             window_minutes: int = 15):
         """Record failed login attempt and block if threshold exceeded"""
         now = datetime.now()
-        self.failed_attempts[ip_address].append(now)
+        attempts = self.failed_attempts[ip_address]
+        attempts.append(now)
         
-        # Remove attempts outside the time window
+        # Attempts are kept oldest-first, so expired ones are trimmed from the left
         cutoff = now - timedelta(minutes=window_minutes)
-        self.failed_attempts[ip_address] = [
-            attempt for attempt in self.failed_attempts[ip_address] 
-            if attempt > cutoff
-        ]
+        while attempts and attempts[0] <= cutoff:
+            attempts.popleft()
         
         # Block IP if too many attempts
-        if len(self.failed_attempts[ip_address]) >= max_attempts:
+        if len(attempts) >= max_attempts:
             self.blocked_ips.add(ip_address)
-            logger.warning(f"IP address blocked: {ip_address}")
+            logger.warning("IP address blocked: %s", ip_address)
     
     def is_ip_blocked(self, ip_address: str) -> bool:
         """Check if IP address is currently blocked"""
         if ip_address in self.blocked_ips:
             # Check if block should be lifted (1 hour block)
             if self.failed_attempts[ip_address]:
-                block_time = min(self.failed_attempts[ip_address])
+                block_time = self.failed_attempts[ip_address][0]
                 if datetime.now() - block_time > timedelta(hours=1):
                     self.blocked_ips.remove(ip_address)
                     self.failed_attempts[ip_address].clear()
@@ -234,7 +312,7 @@ class SecurityManager:
                     'type': 'failed_attempts',
                     'ip_address': ip,
                     'attempts': len(attempts),
-                    'last_attempt': max(attempts).isoformat(),
+                    'last_attempt': attempts[-1].isoformat(),
                     'blocked': ip in self.blocked_ips
                 })
         return events
@@ -245,6 +323,8 @@ class CacheManager:
     def __init__(self):
         self._cache = {}
         self._lock = threading.RLock()
+        # Serializes misses so one thread computes a value while others wait
+        self._fill_lock = threading.Lock()
     
     def get(self, key: str) -> Any:
         """Get value from cache"""
@@ -263,6 +343,17 @@ class CacheManager:
             expiry = time.time() + timeout if timeout else None
             self._cache[key] = (value, expiry)
     
+    def get_or_set(self, key: str, factory: Callable[[], Any], timeout: int = 300) -> Any:
+        """Get value from cache, computing it in a single thread on a miss"""
+        value = self.get(key)
+        if value is None:
+            with self._fill_lock:
+                value = self.get(key)
+                if value is None:
+                    value = factory()
+                    self.set(key, value, timeout)
+        return value
+    
     def delete(self, key: str) -> bool:
         """Delete key from cache"""
         with self._lock:
@@ -297,14 +388,15 @@ class DataProcessor:
             )
         
         # Basic text statistics
-        words = re.findall(r'\b\w+\b', text.lower())
-        sentences = re.split(r'[.!?]+', text)
+        words = _WORD_RE.findall(text.lower())
+        sentences = _SENTENCE_SPLIT_RE.split(text)
         sentences = [s.strip() for s in sentences if s.strip()]
         
+        word_counts = Counter(words)
         char_count = len(text)
         word_count = len(words)
         sentence_count = len(sentences)
-        unique_words = len(set(words))
+        unique_words = len(word_counts)
         
         # Advanced metrics
         avg_word_length = sum(len(word) for word in words) / word_count if word_count > 0 else 0
@@ -313,6 +405,179 @@ class DataProcessor:
         # Readability score (simplified)
         readability = max(0, min(100, 206.835 - 1.015 * (word_count / sentence_count) - 84.6 * (avg_word_length / word_count))) if sentence_count > 0 and word_count > 0 else 0
         
-        # Sentiment analysis (basic)
-        positive_words = ['good', 'great', 'excellent', 'amazing', 'wonderful', 'fantastic', 'positive', 'happy']
-        negative_words = ['bad', 'terrible', 'awful', 'horrible', 'disappointing', 'negative', '
+        # Sentiment analysis (lexicon with negation and intensifier rules)
+        positive_count, negative_count, polarity = _score_sentiment(
+            _SENTIMENT_TOKEN_RE.findall(text.lower().replace('\u2019', "'"))
+        )
+
+        if polarity > 0.1:
+            sentiment = 'positive'
+        elif polarity < -0.1:
+            sentiment = 'negative'
+        else:
+            sentiment = 'neutral'
+
+        sentiment_score = (positive_count - negative_count) / word_count if word_count > 0 else 0
+
+        warnings = []
+        recommendations = []
+        if word_count < 10:
+            warnings.append('Text is very short; results may be less reliable')
+        if avg_sentence_length > 25:
+            recommendations.append('Consider using shorter sentences to improve readability')
+
+        return AnalysisResult(
+            success=True,
+            data={
+                'char_count': char_count,
+                'word_count': word_count,
+                'sentence_count': sentence_count,
+                'unique_words': unique_words,
+                'sentiment': sentiment,
+                'top_words': word_counts.most_common(10)
+            },
+            metrics={
+                'avg_word_length': round(avg_word_length, 2),
+                'avg_sentence_length': round(avg_sentence_length, 2),
+                'readability_score': round(readability, 2),
+                'sentiment_score': round(sentiment_score, 4),
+                'polarity': round(polarity, 4),
+                'lexical_diversity': round(unique_words / word_count, 4) if word_count > 0 else 0
+            },
+            warnings=warnings,
+            recommendations=recommendations,
+            processing_time=time.time() - start_time
+        )
+
+    def analyze_numeric_data(self, data: List[Union[int, float]]) -> AnalysisResult:
+        """Statistical analysis of numeric data"""
+        start_time = time.time()
+
+        try:
+            values = [float(x) for x in data]
+        except (TypeError, ValueError):
+            values = []
+
+        if not values:
+            return AnalysisResult(
+                success=False,
+                data={},
+                metrics={},
+                warnings=['Invalid numeric data'],
+                recommendations=['Provide a list of numbers for analysis'],
+                processing_time=0
+            )
+
+        mean = statistics.mean(values)
+        stdev = statistics.stdev(values) if len(values) > 1 else 0
+
+        # Outliers by z-score
+        outliers = [x for x in values if stdev and abs(x - mean) / stdev > 3]
+
+        warnings = []
+        if len(values) < 3:
+            warnings.append('Small sample size; statistics may be unreliable')
+        if outliers:
+            warnings.append(f'{len(outliers)} outlier(s) detected')
+
+        return AnalysisResult(
+            success=True,
+            data={
+                'count': len(values),
+                'min': min(values),
+                'max': max(values),
+                'outliers': outliers
+            },
+            metrics={
+                'mean': round(mean, 4),
+                'median': round(statistics.median(values), 4),
+                'stdev': round(stdev, 4),
+                'range': round(max(values) - min(values), 4),
+                'sum': round(sum(values), 4)
+            },
+            warnings=warnings,
+            recommendations=[],
+            processing_time=time.time() - start_time
+        )
+
+    def detect_patterns(self, data: Union[str, List[Any]]) -> AnalysisResult:
+        """Detect common patterns in text or sequences"""
+        start_time = time.time()
+
+        if isinstance(data, str) and data:
+            patterns = {name: regex.findall(data) for name, regex in _TEXT_PATTERNS.items()}
+            return AnalysisResult(
+                success=True,
+                data=patterns,
+                metrics={name: len(found) for name, found in patterns.items()},
+                warnings=[],
+                recommendations=[],
+                processing_time=time.time() - start_time
+            )
+
+        if isinstance(data, list) and len(data) > 1:
+            try:
+                values = [float(x) for x in data]
+            except (TypeError, ValueError):
+                values = None
+
+            if values is not None:
+                diffs = [b - a for a, b in zip(values, values[1:])]
+                if all(d > 0 for d in diffs):
+                    trend = 'increasing'
+                elif all(d < 0 for d in diffs):
+                    trend = 'decreasing'
+                elif all(d == 0 for d in diffs):
+                    trend = 'constant'
+                else:
+                    trend = 'mixed'
+
+                return AnalysisResult(
+                    success=True,
+                    data={'trend': trend, 'differences': diffs},
+                    metrics={'avg_change': round(statistics.mean(diffs), 4)},
+                    warnings=[],
+                    recommendations=[],
+                    processing_time=time.time() - start_time
+                )
+
+            counts = Counter(str(item) for item in data)
+            return AnalysisResult(
+                success=True,
+                data={'most_common': counts.most_common(10)},
+                metrics={'unique_items': len(counts)},
+                warnings=[],
+                recommendations=[],
+                processing_time=time.time() - start_time
+            )
+
+        return AnalysisResult(
+            success=False,
+            data={},
+            metrics={},
+            warnings=['Invalid input for pattern detection'],
+            recommendations=['Provide text or a list of values'],
+            processing_time=0
+        )
+
+    def comprehensive_analysis(self, data: Any) -> AnalysisResult:
+        """Pick the most suitable analysis for the given data"""
+        if isinstance(data, str):
+            return self.analyze_text(data)
+        if isinstance(data, list) and data and all(isinstance(x, (int, float)) for x in data):
+            return self.analyze_numeric_data(data)
+        return self.detect_patterns(data)
+
+    def analyze_user_behavior(self, user_id: int,
+                              activities: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Summarize user activity patterns"""
+        activities = activities or []
+        activity_types = Counter(a.get('activity_type') for a in activities)
+
+        return {
+            'user_id': user_id,
+            'total_activities': len(activities),
+            'activity_types': dict(activity_types),
+            'most_common_activity': activity_types.most_common(1)[0][0] if activity_types else None,
+            'generated_at': datetime.now().isoformat()
+        }
@@ -0,0 +1,97 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from werkzeug.security import generate_password_hash
+
+from src.database import DatabaseManager
+
+
+# users table as created before the login_count column existed
+BASELINE_USERS_TABLE = """
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username VARCHAR(50) UNIQUE NOT NULL,
+        email VARCHAR(100) UNIQUE NOT NULL,
+        password_hash VARCHAR(255) NOT NULL,
+        role VARCHAR(20) DEFAULT 'user',
+        is_active BOOLEAN DEFAULT 1,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_login TIMESTAMP,
+        profile_data TEXT
+    )
+"""
+
+
+class DatabaseManagerTests(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'test.db')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def open_manager(self):
+        manager = DatabaseManager(self.db_path)
+        self.addCleanup(manager.close)
+        return manager
+
+    def login_count(self, manager, username):
+        with manager.read() as conn:
+            row = conn.execute(
+                "SELECT login_count FROM users WHERE username = ?", (username,)
+            ).fetchone()
+        return row['login_count']
+
+    def test_migration_backfills_login_count_from_profile_data(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(BASELINE_USERS_TABLE)
+        conn.executemany(
+            "INSERT INTO users (username, email, password_hash, profile_data) VALUES (?, ?, ?, ?)",
+            [
+                ('valid', 'valid@example.com', 'x', '{"statistics": {"logins": 7}}'),
+                ('malformed', 'malformed@example.com', 'x', '{"statistics": '),
+                ('missing', 'missing@example.com', 'x', None),
+            ]
+        )
+        conn.commit()
+        conn.close()
+
+        manager = self.open_manager()
+
+        self.assertEqual(self.login_count(manager, 'valid'), 7)
+        self.assertEqual(self.login_count(manager, 'malformed'), 0)
+        self.assertEqual(self.login_count(manager, 'missing'), 0)
+
+    def test_login_upgrades_legacy_hash_and_counts_login(self):
+        manager = self.open_manager()
+        user_id = manager.create_user('legacy', 'legacy@example.com', 'Passw0rd!')
+        with manager.transaction() as conn:
+            conn.execute(
+                "UPDATE users SET password_hash = ? WHERE id = ?",
+                (generate_password_hash('Passw0rd!', method='pbkdf2:sha256'), user_id)
+            )
+
+        self.assertIsNotNone(manager.authenticate_user('legacy', 'Passw0rd!'))
+
+        with manager.read() as conn:
+            row = conn.execute(
+                "SELECT password_hash, login_count FROM users WHERE id = ?", (user_id,)
+            ).fetchone()
+        self.assertTrue(row['password_hash'].startswith('$argon2id$'))
+        self.assertEqual(row['login_count'], 1)
+        self.assertIsNotNone(manager.authenticate_user('legacy', 'Passw0rd!'))
+        self.assertEqual(self.login_count(manager, 'legacy'), 2)
+
+    def test_duplicate_signup_returns_none(self):
+        manager = self.open_manager()
+        self.assertIsNotNone(manager.create_user('alice', 'alice@example.com', 'Passw0rd!'))
+
+        self.assertIsNone(manager.create_user('alice', 'other@example.com', 'Passw0rd!'))
+        self.assertIsNone(manager.create_user('bob', 'alice@example.com', 'Passw0rd!'))
+
+
+if __name__ == '__main__':
+    unittest.main()
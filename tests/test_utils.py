@@ -0,0 +1,46 @@
+import unittest
+
+from src.utils import DataProcessor, _SENTIMENT_TOKEN_RE, _score_sentiment
+
+
+def score(text):
+    return _score_sentiment(_SENTIMENT_TOKEN_RE.findall(text.lower()))
+
+
+class ScoreSentimentTests(unittest.TestCase):
+    def test_plain_positive(self):
+        self.assertEqual(score("this is a good movie"), (1, 0, 1.0))
+
+    def test_negation_flips_next_sentiment_word(self):
+        self.assertEqual(score("not good"), (0, 1, -0.5))
+        self.assertEqual(score("not bad"), (1, 0, 0.5))
+
+    def test_negation_reaches_past_filler_words(self):
+        self.assertEqual(score("this is not a good movie"), (0, 1, -0.5))
+
+    def test_negation_expires_outside_window(self):
+        self.assertEqual(score("not that it was ever a good idea"), (1, 0, 1.0))
+
+    def test_clause_punctuation_ends_negation(self):
+        self.assertEqual(score("no problems, great service"), (1, 0, 1.0))
+        self.assertEqual(score("not really. good though"), (1, 0, 1.0))
+
+    def test_nt_contraction_negates(self):
+        self.assertEqual(score("this movie isn't good"), (0, 1, -0.5))
+        self.assertEqual(score("it wasn't bad"), (1, 0, 0.5))
+
+    def test_analyze_text_keeps_praise_after_negated_clause(self):
+        result = DataProcessor().analyze_text("No problems, great service")
+        self.assertEqual(result.data['sentiment'], 'positive')
+
+    def test_analyze_text_handles_curly_apostrophe(self):
+        result = DataProcessor().analyze_text("This movie isn\u2019t good.")
+        self.assertEqual(result.data['sentiment'], 'negative')
+
+    def test_analyze_text_labels_negated_praise_negative(self):
+        result = DataProcessor().analyze_text("This is not a good movie.")
+        self.assertEqual(result.data['sentiment'], 'negative')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,7 @@
+"""
+WSGI entry point for production servers
+"""
+
+from src import create_app
+
+app = create_app()